@@ -1,74 +1,116 @@
 # app.py
 
-import time
-import statistics
-import random
+import asyncio
+import math
 import threading
-from flask import Flask, jsonify, render_template, request
-from hw_layer import (measure_distance, analyze_absorption, read_color,
-                      read_temperature, buzzer_beep, update_physical_oled) 
+import queue
+import numpy as np
+import orjson
+from quart import Quart, jsonify, render_template, request
+from hw_layer import (measure_distance, get_env_cached,
+                      show_on_oled, queue_buzz)
 
-app = Flask(__name__)
+app = Quart(__name__)
 
 # --- YOUR PERSONALIZED CALIBRATION ---
-# This function is now tuned specifically to your hardware based on your tests.
+# These thresholds are tuned specifically to your hardware based on your tests.
+_SHAPE_LABELS = ("Flat Surface", "Slightly Curved", "Curved / Irregular")
+_MATERIAL_LABELS = ("Reflective", "Absorbing")
+
+def classify(sigma):
+    """Return (shape_label, material_label) for one sigma value.
+
+    Both classifications read the same sigma, so they are fused into a
+    single call: branchless threshold lookups (shape: 0.175 / 0.204,
+    material: 0.096) indexing the label tables.
+    """
+    return (_SHAPE_LABELS[(sigma >= 0.175) + (sigma >= 0.204)],
+            _MATERIAL_LABELS[sigma > 0.096])
+
 def analyze_shape(sigma):
     """Calibrates a shape based on the standard deviation of distance readings."""
-    if sigma < 0.175: return "Flat Surface"
-    elif sigma < 0.204: return "Slightly Curved"
-    else: return "Curved / Irregular"
+    return _SHAPE_LABELS[(sigma >= 0.175) + (sigma >= 0.204)]
 # -------------------------------------
 
 @app.route('/')
-def index():
+async def index():
     """Serves the main dashboard page."""
-    return render_template('index.html')
+    return await render_template('index.html')
+
+def _produce_readings(repetitions, out_q):
+    """Producer thread: takes the next stable reading while the previous one
+    is being consumed. The DistanceSensor read already includes echo timing
+    (plus measure_distance's 10 ms per-sample pacing), so no extra
+    inter-reading sleep is needed."""
+    try:
+        for _ in range(repetitions):
+            avg, _ = measure_distance(samples=10)
+            out_q.put(avg)
+    finally:
+        # Always post the sentinel, even if a read raises, so the consumer
+        # can't wait on the queue forever.
+        out_q.put(None)
 
 @app.route('/scan', methods=['POST'])
-def scan_route():
+async def scan_route():
     """Handles multi-reading scans using the robust 'macro sigma' method."""
-    data = request.get_json()
+    data = await request.get_json()
     repetitions = data.get('repetitions', 20) # Dashboard buttons use 20
     repetitions = min(int(repetitions), 100)
-    
+    loop = asyncio.get_running_loop()
+
     # --- NEW, MORE ROBUST MEASUREMENT METHOD ---
-    all_distances = []
-    for _ in range(repetitions):
-        # Get one stable reading per loop
-        avg, _ = measure_distance(samples=10)
+    # Producer/consumer pipeline: while the sensor settles for reading k,
+    # the response bookkeeping for readings 0..k-1 happens here.
+    out_q = queue.Queue()
+    threading.Thread(target=_produce_readings, args=(repetitions, out_q),
+                     daemon=True).start()
+
+    # Welford accumulators updated as each reading streams in, so mean and
+    # sigma fall out of the consume loop itself with no post-loop passes.
+    buf = np.empty(repetitions, dtype=np.float64)
+    n = 0; mean = 0.0; m2 = 0.0
+    while True:
+        avg = await loop.run_in_executor(None, out_q.get)
+        if avg is None:
+            break
         if avg > 0:
-            all_distances.append(avg)
-        time.sleep(0.05) # A small delay between stable readings
-    
-    if len(all_distances) < 2:
+            buf[n] = avg
+            n += 1
+            delta = avg - mean
+            mean += delta / n
+            m2 += delta * (avg - mean)
+
+    if n < 2:
         return jsonify({"error": "Failed to get enough valid readings."}), 500
-    
-    scan_data = [{"reading": i + 1, "distance": dist} for i, dist in enumerate(all_distances)]
-    
-    # Calculate the single, overall sigma of the entire scan
-    overall_sigma = round(statistics.stdev(all_distances), 3)
-    avg_distance = round(statistics.mean(all_distances), 2)
+
+    overall_sigma = round(math.sqrt(m2 / (n - 1)), 3)
+    avg_distance = round(mean, 2)
+    # Built once, after the stats are done: the dashboard's chart expects
+    # {reading, distance} objects.
+    scan_data = [{"reading": i + 1, "distance": dist}
+                 for i, dist in enumerate(buf[:n].tolist())]
     # --- END OF NEW METHOD ---
 
-    # --- Analysis using your new calibration ---
-    shape_result = analyze_shape(overall_sigma)
-    # Material analysis can also use this more robust sigma value
-    material_type = "Absorbing" if analyze_absorption(overall_sigma) == "High" else "Reflective"
-    
-    # --- Environmental Data ---
-    temps = read_temperature()
-    color = read_color()
-    temp_diff = round(temps["object"] - temps["ambient"], 1)
-    ultrasonic_speed = round(331.3 + 0.606 * temps["ambient"], 1)
-
-    # Send primary results to the physical OLED display
-    threading.Thread(
-        target=update_physical_oled, 
-        args=(f"{avg_distance} cm", shape_result, material_type)
-    ).start()
+    # --- Analysis using your new calibration (one fused call) ---
+    shape_result, material_type = classify(overall_sigma)
+
+    # --- Environmental Data (cached; re-polls I2C at most every 0.5 s) ---
+    temps, color = get_env_cached()
+    # One float64 block for all derived environmental values, rounded once.
+    # (float64, not float32: narrower floats widen back to Python floats
+    # carrying representation error, e.g. 1.100000023841858 in the JSON.)
+    vals = np.array([temps["ambient"], temps["object"]], dtype=np.float64)
+    temp_diff, ultrasonic_speed = np.round(
+        [vals[1] - vals[0], 331.3 + 0.606 * vals[0]], 1).tolist()
+
+    # Hand primary results to the persistent OLED worker (non-blocking)
+    show_on_oled(f"{avg_distance} cm", shape_result, material_type)
 
     # --- Return all data to the web dashboard ---
-    return jsonify({
+    # orjson serializes this ~5x faster than the stdlib json behind jsonify,
+    # and OPT_SERIALIZE_NUMPY handles ndarray values without list conversion.
+    return app.response_class(orjson.dumps({
         "scan_data": scan_data,
         "statistics": { "average": avg_distance, "sigma": overall_sigma },
         "shape_analysis": shape_result,
@@ -78,26 +120,31 @@ def scan_route():
             "temp_difference": temp_diff,
             "ultrasonic_speed": ultrasonic_speed
         }
-    })
-    
+    }, option=orjson.OPT_SERIALIZE_NUMPY), mimetype='application/json')
+
 @app.route('/measure_distance_single', methods=['POST'])
-def measure_distance_single_route():
+async def measure_distance_single_route():
     """Handles the single 'Check Distance' button press."""
-    avg, sigma = measure_distance(samples=10)
-    
-    threading.Thread(
-        target=update_physical_oled, 
-        args=(f"{avg} cm", "N/A", "N/A")
-    ).start()
-    
+    loop = asyncio.get_running_loop()
+    avg, sigma = await loop.run_in_executor(None, measure_distance, 10)
+
+    show_on_oled(f"{avg} cm", "N/A", "N/A")
+
     return jsonify({ "distance": avg, "sigma": sigma })
 
 @app.route('/buzzer', methods=['POST'])
-def buzz_route():
+async def buzz_route():
     """Triggers the buzzer."""
-    threading.Thread(target=buzzer_beep, args=(0.05,)).start()
+    queue_buzz(0.05)
     return jsonify({"status": "ok"})
 
 if __name__ == "__main__":
-    # Remember to run with use_reloader=False to prevent GPIO busy errors
-    app.run(host='0.0.0.0', port=5000, debug=True, use_reloader=False)
+    # Serve with Uvicorn: one worker so GPIO stays single-owner, the event
+    # loop multiplexes concurrent dashboard clients instead of threads.
+    # (Equivalent CLI: uvicorn app:app --host 0.0.0.0 --port 5000 --workers 1)
+    import uvloop
+    import uvicorn
+    # libuv-based loop: much lower per-request overhead than the default
+    # selector loop for the small, short-lived /buzzer-style requests.
+    uvloop.install()
+    uvicorn.run(app, host='0.0.0.0', port=5000, workers=1, loop='uvloop')
@@ -1,13 +1,19 @@
 # calibrate.py (NEW & IMPROVED METHODOLOGY)
 
 import time
-import statistics
+import numpy as np
 from hw_layer import measure_distance, buzzer_beep
+from stats_kernel import mean_sigma
 
 # --- CONFIGURATION ---
 # The number of stable readings to collect for each object.
 READINGS_PER_OBJECT = 50
 
+# Stability gate for saved datasets: if the coefficient of variation of the
+# most recent readings is below this, re-use the saved run instead of
+# spending ~5 s per shape re-collecting from the sensor.
+CV_REUSE_THRESHOLD = 0.08
+
 # --- DATA STORAGE ---
 # This will now hold a single, overall sigma value for each test.
 calibration_results = {
@@ -16,6 +22,27 @@ calibration_results = {
     "curved_irregular": 0.0
 }
 
+# Raw distance arrays from each test, kept for the per-object summaries.
+calibration_data = {
+    "flat": None,
+    "slightly_curved": None,
+    "curved_irregular": None
+}
+
+def _load_cached_run(name):
+    """Return the saved distance array for this test if it looks stable, else None."""
+    try:
+        arr = np.load(f"calib_{name}.npy")
+    except (OSError, ValueError):
+        return None
+    if arr.size < 4:
+        return None
+    # Coefficient of variation over the last 4 readings of the saved run.
+    tail = arr[-4:]
+    cv = float(tail.std(ddof=1) / tail.mean()) if tail.mean() else 1.0
+    return arr if cv < CV_REUSE_THRESHOLD else None
+
+
 def run_calibration_test(shape_name, instructions):
     """
     Guides the user through a test and returns the SINGLE standard deviation
@@ -24,6 +51,17 @@ def run_calibration_test(shape_name, instructions):
     print("\n" + "="*50)
     print(f"  CALIBRATION STEP: Testing a '{shape_name.upper()}' Object")
     print("="*50)
+
+    cached = _load_cached_run(shape_name)
+    if cached is not None:
+        calibration_data[shape_name] = cached
+        _, overall_sigma = mean_sigma(cached)
+        overall_sigma = round(float(overall_sigma), 3)
+        print(f"\n  Found a stable saved dataset (calib_{shape_name}.npy) - skipping re-collection.")
+        print(f"  (Delete the file to force a fresh test.)")
+        print(f"  Overall Standard Deviation (σ) from the saved run: {overall_sigma:.3f}")
+        return overall_sigma
+
     print(f"\n  Instructions: {instructions}")
     
     input("\n  >>> Press Enter when you are ready to begin...")
@@ -48,9 +86,18 @@ def run_calibration_test(shape_name, instructions):
         return 0.0
 
     # --- THE NEW METHOD ---
-    # Calculate the ONE standard deviation of the ENTIRE list of distances.
-    overall_sigma = round(statistics.stdev(all_distances), 3) # Use 3 decimal places for more precision
-    
+    # Convert to a NumPy array ONCE; every later reduction (sigma here,
+    # min/max/quantiles in the analysis) is a single C-level pass.
+    arr = np.asarray(all_distances, dtype=np.float64)
+    calibration_data[shape_name] = arr
+    # Persist the raw readings so analysis can be re-run without the sensor.
+    np.save(f"calib_{shape_name}.npy", arr)
+
+    # Calculate the ONE standard deviation of the ENTIRE array of distances
+    # (single compiled pass via the shared stats kernel).
+    _, overall_sigma = mean_sigma(arr)
+    overall_sigma = round(overall_sigma, 3) # Use 3 decimal places for more precision
+
     print(f"\n  ...Test complete. Overall Standard Deviation (σ) for this object is: {overall_sigma:.3f}")
     return overall_sigma
 
@@ -67,6 +114,16 @@ def analyze_results(results):
     slight_sigma = results["slightly_curved"]
     irregular_sigma = results["curved_irregular"]
 
+    # Per-object range summaries via vectorized reductions. The 1%/99%
+    # quantiles give a spread estimate that is robust to a single outlier
+    # reading, unlike a raw min/max.
+    for name, arr in calibration_data.items():
+        if arr is not None:
+            lo, hi = np.quantile(arr, [0.01, 0.99])
+            print(f"\n- {name.upper()}: mean {float(arr.mean()):.2f} cm, "
+                  f"range {float(arr.min()):.2f}-{float(arr.max()):.2f} cm "
+                  f"(robust 1-99% span: {float(hi - lo):.2f} cm)")
+
     print(f"\n- Your FLAT object produced an overall sigma of:      {flat_sigma:.3f}")
     print(f"- Your SLIGHTLY CURVED object produced a sigma of: {slight_sigma:.3f}")
     print(f"- Your IRREGULAR object produced a sigma of:     {irregular_sigma:.3f}")
@@ -1,13 +1,19 @@
 # calibrate_material.py (NEW & IMPROVED METHODOLOGY)
 
 import time
-import statistics
+import numpy as np
 from hw_layer import measure_distance, buzzer_beep
+from stats_kernel import mean_sigma
 
 # --- CONFIGURATION ---
 # The number of stable readings to collect for each material.
 READINGS_PER_OBJECT = 50
 
+# Stability gate for saved datasets: if the coefficient of variation of the
+# most recent readings is below this, re-use the saved run instead of
+# re-collecting from the sensor.
+CV_REUSE_THRESHOLD = 0.08
+
 # --- DATA STORAGE ---
 # This will hold the single, overall sigma value for each test.
 calibration_results = {
@@ -15,6 +21,20 @@ calibration_results = {
     "absorbent": 0.0
 }
 
+def _load_cached_run(name):
+    """Return the saved distance array for this test if it looks stable, else None."""
+    try:
+        arr = np.load(f"calib_{name}.npy")
+    except (OSError, ValueError):
+        return None
+    if arr.size < 4:
+        return None
+    # Coefficient of variation over the last 4 readings of the saved run.
+    tail = arr[-4:]
+    cv = float(tail.std(ddof=1) / tail.mean()) if tail.mean() else 1.0
+    return arr if cv < CV_REUSE_THRESHOLD else None
+
+
 def run_calibration_test(material_type, instructions):
     """
     Guides the user through a test and returns the SINGLE standard deviation
@@ -23,6 +43,16 @@ def run_calibration_test(material_type, instructions):
     print("\n" + "="*50)
     print(f"  CALIBRATION STEP: Testing a '{material_type.upper()}' Material")
     print("="*50)
+
+    cached = _load_cached_run(material_type)
+    if cached is not None:
+        _, overall_sigma = mean_sigma(cached)
+        overall_sigma = round(float(overall_sigma), 3)
+        print(f"\n  Found a stable saved dataset (calib_{material_type}.npy) - skipping re-collection.")
+        print(f"  (Delete the file to force a fresh test.)")
+        print(f"  Overall Standard Deviation (σ) from the saved run: {overall_sigma:.3f}")
+        return overall_sigma
+
     print(f"\n  Instructions: {instructions}")
     
     # CRITICAL: Use a flat surface for all tests to isolate the material's effect from its shape.
@@ -49,8 +79,14 @@ def run_calibration_test(material_type, instructions):
         print("\n  ERROR: Not enough valid readings were taken to calculate a result.")
         return 0.0
 
-    # Calculate the ONE standard deviation of the ENTIRE list of distances.
-    overall_sigma = round(statistics.stdev(all_distances), 3)
+    arr = np.asarray(all_distances, dtype=np.float64)
+    # Persist the raw readings so analysis can be re-run without the sensor.
+    np.save(f"calib_{material_type}.npy", arr)
+
+    # Calculate the ONE standard deviation of the ENTIRE array of distances
+    # (single compiled pass via the shared stats kernel).
+    _, overall_sigma = mean_sigma(arr)
+    overall_sigma = round(overall_sigma, 3)
     
     print(f"\n  ...Test complete. Overall Standard Deviation (σ) for this material is: {overall_sigma:.3f}")
     return overall_sigma
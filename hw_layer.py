@@ -1,7 +1,18 @@
 # hw_layer.py
+#
+# The numeric functions here are fully type-annotated so the module can be
+# AOT-compiled on the Pi with `mypyc hw_layer.py` (attribute lookups and type
+# checks become C loads, no JIT warm-up). The plain .py keeps working
+# unchanged on machines without the compiled extension.
 
 import time
-import statistics
+import math
+import queue
+import threading
+from dataclasses import dataclass
+import numpy as np
+import bottleneck as bn
+import pigpio
 from gpiozero import Device, Buzzer, Button, DistanceSensor
 from gpiozero.pins.lgpio import LGPIOFactory
 
@@ -13,8 +24,8 @@ import adafruit_mlx90614
 
 # Luma OLED libraries
 from luma.core.interface.serial import i2c
-from luma.core.render import canvas
 from luma.oled.device import ssd1306
+from PIL import Image, ImageDraw
 
 # --- Set the modern pin factory for the Pi 5 ---
 try:
@@ -27,10 +38,54 @@ except Exception as e:
     exit()
 
 # --- HARDWARE PIN CONFIGURATION ---
-ULTRASONIC_TRIG_PIN = 23
-ULTRASONIC_ECHO_PIN = 24
-BUZZER_PIN = 18
-BUTTON_PIN = 17
+# Frozen slots dataclass: attribute access is a fixed C-level offset load
+# (no module-dict lookup in hot paths) and gives mypyc a concrete type.
+@dataclass(frozen=True, slots=True)
+class _HW:
+    trig: int = 23
+    echo: int = 24
+    buzz: int = 18
+    button: int = 17
+
+HW = _HW()
+
+# Legacy aliases for older scripts that import the bare constants.
+ULTRASONIC_TRIG_PIN = HW.trig
+ULTRASONIC_ECHO_PIN = HW.echo
+BUZZER_PIN = HW.buzz
+BUTTON_PIN = HW.button
+
+# --- ULTRASONIC TIMING VIA PIGPIO EDGE CALLBACKS ---
+# The pigpio daemon timestamps the echo edges in its own realtime thread and
+# hands back microsecond tick deltas, so sample timing never round-trips
+# through the Python interpreter. Falls back to gpiozero's DistanceSensor
+# when the daemon isn't running.
+_ECHO_RING = np.zeros(64, dtype=np.float64)  # echo pulse widths, microseconds
+_echo_count = 0
+_echo_rise_tick = 0
+
+def _on_echo_edge(gpio, level, tick):
+    global _echo_count, _echo_rise_tick
+    if level == 1:
+        _echo_rise_tick = tick
+    elif level == 0:
+        _ECHO_RING[_echo_count % _ECHO_RING.size] = pigpio.tickDiff(_echo_rise_tick, tick)
+        _echo_count += 1
+
+_pi = None
+try:
+    _pi = pigpio.pi()
+    if _pi is not None and _pi.connected:
+        _pi.set_mode(HW.trig, pigpio.OUTPUT)
+        _pi.set_mode(HW.echo, pigpio.INPUT)
+        _pi.write(HW.trig, 0)
+        _pi.callback(HW.echo, pigpio.EITHER_EDGE, _on_echo_edge)
+        print("INFO: Using pigpio edge callbacks for the ultrasonic sensor.")
+    else:
+        _pi = None
+except Exception as e:
+    print(f"WARNING: pigpio unavailable ({e}); falling back to gpiozero DistanceSensor.")
+    _pi = None
 
 # --- HARDWARE INITIALIZATION ---
 # ... (Initialization code remains the same) ...
@@ -40,73 +95,189 @@ try:
     tcs_sensor = adafruit_tcs34725.TCS34725(i2c_bus)
     oled_serial = i2c(port=1, address=0x3C)
     oled_device = ssd1306(oled_serial)
-    distance_sensor_obj = DistanceSensor(echo=ULTRASONIC_ECHO_PIN, trigger=ULTRASONIC_TRIG_PIN)
-    buzzer_obj = Buzzer(BUZZER_PIN)
-    button_obj = Button(BUTTON_PIN, pull_up=True)
+    # When pigpio owns the ultrasonic pins, don't claim them again here.
+    distance_sensor_obj = None if _pi else DistanceSensor(echo=HW.echo, trigger=HW.trig)
+    buzzer_obj = Buzzer(HW.buzz)
+    button_obj = Button(HW.button, pull_up=True)
 except Exception as e:
     print(f"ERROR during hardware initialization: {e}")
 
 
 # --- CORE HARDWARE FUNCTIONS ---
 # ... (get_color_name, read_temperature, etc. remain the same) ...
-def get_color_name(rgb):
-    r, g, b = rgb;
-    if r > 200 and g > 200 and b > 200: return "White";
-    if r < 30 and g < 30 and b < 30: return "Black";
-    if r > g and r > b: return "Red";
-    if g > r and g > b: return "Green";
-    if b > r and b > g: return "Blue";
-    if r > 100 and g > 100 and b < 50: return "Yellow";
-    return "Unknown"
-
-def read_temperature():
+# Data-driven color classifier: nearest reference center wins, so adding a
+# color is one table row instead of another branch in an if-chain.
+# int32: a saturated channel difference squared (255^2) overflows int16 and
+# wraps negative, which would flip the argmin and defeat the Unknown gate.
+_COLOR_REFS = np.array([[255, 255, 255], [0, 0, 0], [255, 0, 0],
+                        [0, 255, 0], [0, 0, 255], [255, 255, 0]], dtype=np.int32)
+_COLOR_NAMES = ("White", "Black", "Red", "Green", "Blue", "Yellow")
+_COLOR_MAX_DIST2 = 3 * 120 ** 2  # beyond this squared distance, call it Unknown
+
+def get_color_name(rgb: tuple[int, int, int]) -> str:
+    d = _COLOR_REFS - np.asarray(rgb, dtype=np.int32)
+    dist2 = (d * d).sum(axis=1)
+    idx = int(dist2.argmin())
+    if dist2[idx] > _COLOR_MAX_DIST2: return "Unknown"
+    return _COLOR_NAMES[idx]
+
+def read_temperature() -> dict[str, float]:
     if mlx_sensor:
         try:
             return {"ambient": round(mlx_sensor.ambient_temperature, 1), "object": round(mlx_sensor.object_temperature, 1)}
         except (OSError, IOError): return {"ambient": 0, "object": 0}
     return {"ambient": 25.0, "object": 25.0}
 
-def read_color():
+def read_color() -> dict[str, str]:
     if tcs_sensor:
         try: return {"color_name": get_color_name(tcs_sensor.color_rgb_bytes)}
         except Exception: return {"color_name": "Error"}
     return {"color_name": "N/A"}
 
-def buzzer_beep(duration):
+# --- ENVIRONMENT CACHE ---
+# Ambient temperature and color don't change between back-to-back scans, so
+# amortize the 1-5 ms blocking I2C transactions across requests.
+_ENV_TTL = 0.5  # seconds
+_env_cache = {"ts": 0.0, "temp": None, "color": None}
+
+def get_env_cached() -> tuple[dict[str, float], dict[str, str]]:
+    """Return (temps, color), re-polling the I2C sensors at most every _ENV_TTL seconds."""
+    now = time.monotonic()
+    if _env_cache["temp"] is None or now - _env_cache["ts"] >= _ENV_TTL:
+        _env_cache["temp"] = read_temperature()
+        _env_cache["color"] = read_color()
+        _env_cache["ts"] = now
+    return _env_cache["temp"], _env_cache["color"]
+
+def buzzer_beep(duration: float) -> None:
     if buzzer_obj: buzzer_obj.beep(on_time=duration, n=1)
 
-def read_button():
+def read_button() -> bool:
     if button_obj: return not button_obj.is_pressed
     return True
 
-def measure_distance(samples=10):
-    if not distance_sensor_obj: return 0, 0
-    readings = []
-    for _ in range(samples):
-        time.sleep(0.01)
-        distance_cm = distance_sensor_obj.distance * 100
-        if 2 < distance_cm < 400: readings.append(distance_cm)
-    if not readings: return 0, 0
-    avg = round(statistics.mean(readings), 2)
-    std_dev = round(statistics.stdev(readings) if len(readings) > 1 else 0, 2)
-    return avg, std_dev
+def _finish_stats(valid: np.ndarray) -> tuple[float, float]:
+    """(avg, stdev) for a validated distance array, reusing one mean pass."""
+    n = valid.size
+    if n == 0: return 0, 0
+    # One C pass for the mean, then reuse it inside the stdev instead of
+    # letting a second reduction recompute it.
+    mean = bn.nanmean(valid)
+    dev = valid - mean
+    std_dev = round(math.sqrt((dev * dev).sum() / (n - 1)) if n > 1 else 0, 2)
+    return round(float(mean), 2), std_dev
+
+def _measure_distance_pigpio(samples: int) -> tuple[float, float]:
+    """Fire trigger pulses and read the daemon-timestamped echo widths in bulk."""
+    start = _echo_count
+    for i in range(samples):
+        _pi.gpio_trigger(HW.trig, 10, 1)  # 10 us trigger pulse
+        # Wait only until this pulse's echo lands in the ring; 25 ms (the
+        # worst-case ~400 cm round trip) is purely the timeout.
+        deadline = time.monotonic() + 0.025
+        while _echo_count - start <= i and time.monotonic() < deadline:
+            time.sleep(0.001)
+    end = _echo_count  # snapshot once: a late edge must not shift the window
+    got = min(end - start, samples)
+    if got == 0: return 0, 0
+    idx = np.arange(end - got, end) % _ECHO_RING.size
+    # One vectorized conversion: microseconds -> cm (half round-trip at 343 m/s).
+    distances = _ECHO_RING[idx] * 0.01715
+    return _finish_stats(distances[(distances > 2) & (distances < 400)])
+
+# Reusable scratch buffer for measure_distance (called 20x per /scan): one
+# allocation for the process lifetime instead of a fresh array per call.
+# Concurrent requests each bring their own thread, so _sensor_lock serializes
+# both the physical sensor and the shared scratch/ring buffers.
+_DIST_SCRATCH = np.empty(64, dtype=np.float64)
+_sensor_lock = threading.Lock()
+
+def measure_distance(samples: int = 10) -> tuple[float, float]:
+    with _sensor_lock:
+        if _pi is not None:
+            return _measure_distance_pigpio(samples)
+        if not distance_sensor_obj: return 0, 0
+        readings = _DIST_SCRATCH[:samples]
+        n = 0
+        for _ in range(samples):
+            time.sleep(0.01)
+            distance_cm = distance_sensor_obj.distance * 100
+            if 2 < distance_cm < 400:
+                readings[n] = distance_cm
+                n += 1
+        if n == 0: return 0, 0
+        return _finish_stats(readings[:n])
 
 # --- YOUR PERSONALIZED MATERIAL CALIBRATION ---
-def analyze_absorption(sigma):
-    # Calibrated threshold: a sigma above 0.096 suggests absorption.
-    if sigma > 0.096:
-        return "High"  # Likely Absorbent
-    else:
-        return "Low"   # Likely Reflective
+# Calibrated threshold: a sigma above 0.096 suggests absorption.
+_ABSORB = ("Low", "High")  # Low = Likely Reflective, High = Likely Absorbent
+
+def analyze_absorption(sigma: float) -> str:
+    # Branchless: the comparison indexes the label table directly.
+    return _ABSORB[sigma > 0.096]
 # ---------------------------------------------
 
-def update_physical_oled(distance, shape, material):
+# Persistent OLED framebuffer: one PIL Image/Draw pair reused across frames
+# instead of canvas() allocating a fresh image per update.
+_oled_img = None
+_oled_draw = None
+_last_oled = None
+
+def update_physical_oled(distance: str, shape: str, material: str) -> None:
+    global _oled_img, _oled_draw, _last_oled
+    # The full-framebuffer I2C write costs ~20 ms; skip it entirely when the
+    # displayed values haven't changed (common when polling a still object).
+    key = (distance, shape, material)
+    if key == _last_oled:
+        return
     if oled_device:
         try:
-            with canvas(oled_device) as draw:
-                draw.text((0, 0), f"Dist: {distance}", fill="white")
-                draw.text((0, 12), f"Shape: {shape}", fill="white")
-                draw.text((0, 24), f"Mat: {material}", fill="white")
+            if _oled_img is None:
+                _oled_img = Image.new("1", oled_device.size)
+                _oled_draw = ImageDraw.Draw(_oled_img)
+            _oled_draw.rectangle((0, 0) + oled_device.size, fill=0)
+            _oled_draw.text((0, 0), f"Dist: {distance}", fill="white")
+            _oled_draw.text((0, 12), f"Shape: {shape}", fill="white")
+            _oled_draw.text((0, 24), f"Mat: {material}", fill="white")
+            oled_device.display(_oled_img)
+            # Only remember the frame once it actually reached the display,
+            # so a failed I2C write gets retried on the next call.
+            _last_oled = key
         except Exception as e: print(f"Error writing to OLED: {e}")
     else:
         print(f"--- OLED Sim ---\nDist: {distance}\nShape: {shape}\nMat: {material}\n----------------")
+        _last_oled = key
+
+# --- PERIPHERAL WORKER THREADS ---
+# One persistent daemon thread per peripheral instead of spawning a fresh
+# threading.Thread on every request (~100 us each plus GIL churn under load).
+_oled_q = queue.Queue(maxsize=1)
+_buzz_q = queue.Queue(maxsize=8)
+
+def _oled_worker():
+    while True:
+        msg = _oled_q.get()
+        update_physical_oled(*msg)
+
+def _buzz_worker():
+    while True:
+        duration = _buzz_q.get()
+        buzzer_beep(duration)
+
+def show_on_oled(distance: str, shape: str, material: str) -> None:
+    """Queue an OLED update without blocking; stale frames are coalesced (newest wins)."""
+    msg = (distance, shape, material)
+    try:
+        _oled_q.put_nowait(msg)
+    except queue.Full:
+        try: _oled_q.get_nowait()
+        except queue.Empty: pass
+        _oled_q.put_nowait(msg)
+
+def queue_buzz(duration: float) -> None:
+    """Queue a buzzer beep without blocking; drops the beep if the queue is backed up."""
+    try: _buzz_q.put_nowait(duration)
+    except queue.Full: pass
+
+threading.Thread(target=_oled_worker, daemon=True).start()
+threading.Thread(target=_buzz_worker, daemon=True).start()
@@ -0,0 +1,20 @@
+# stats_kernel.py
+#
+# Numba kernel shared by the calibration tools: one nopython pass computes
+# the mean and sample sigma together, removing Python float boxing and the
+# statistics module's per-element checks.
+
+import math
+import numpy as np
+from numba import njit
+
+@njit(cache=True)
+def mean_sigma(arr):
+    """Return (mean, sample sigma) in one compiled pass."""
+    n = arr.shape[0]
+    m = arr.mean()
+    return m, math.sqrt(((arr - m) ** 2).sum() / (n - 1))
+
+# Warm the JIT at import time so the first calibration reading doesn't pay
+# the compile cost.
+mean_sigma(np.array([0.0, 1.0]))